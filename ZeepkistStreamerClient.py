@@ -1,184 +1,239 @@
 import websocket
-import msgpack
+import msgspec
 import threading
 import time
-import traceback
+import logging
 import signal
 import sys
-import random
+import numpy as np
 
 WS_URL = "ws://localhost:8080"
 
 # Thread-shared state
-latest_state = None           # dict populated by on_message when StreamData is received
-waiting_state = False         # set True by sequence thread when it requested a state
-waiting_state_lock = threading.Lock()
+latest_state = None           # StreamData populated by on_message when received
+state_ready = threading.Event()  # set by on_message when a StreamData arrives
+_send_bin = None              # bound binary send of the open socket, set in on_open
+_err_count = 0                # on_message errors logged in the current 1 s window
+_err_window = 0.0             # monotonic start of that window
 
 # Tuning
 UPDATE_HZ = 60
 UPDATE_INTERVAL = 1.0 / UPDATE_HZ
+LOG_LEVEL = logging.INFO      # WARNING silences the connect/disconnect banners too
+MAX_MSG_ERRORS_PER_SEC = 5    # cap on logged on_message tracebacks
+
+log = logging.getLogger("zsc")
+
+# ---------------- Message types ----------------
+
+# Decoded StreamData holds no reference cycles, so it's kept out of the GC
+class State(msgspec.Struct, gc=False):
+    position: list[float]
+    rotation: list[float]
+    localVelocity: list[float]
+    localAngularVelocity: list[float]
+
+class StreamData(msgspec.Struct, gc=False):
+    state: State
+    timestamp: float
+
+# "cmd": "ACTION" is emitted as the struct tag, pre-encoded by msgspec
+class InputCommand(msgspec.Struct, tag_field="cmd", tag="ACTION"):
+    steer: float
+    brake: float
+    armsUp: float
+    reset: float
+
+    def __post_init__(self):
+        # msgspec doesn't type-check on construction or encode; cast once here so
+        # ints and numpy scalars from a model still go out as floats on the wire
+        self.steer = float(self.steer)
+        self.brake = float(self.brake)
+        self.armsUp = float(self.armsUp)
+        self.reset = float(self.reset)
+
+# Reused MessagePack encoder/decoder (only the sequence thread sends)
+_enc = msgspec.msgpack.Encoder()
+_dec = msgspec.msgpack.Decoder(StreamData)
+
+# STATE_REQUEST never changes, so encode it once
+_STATE_REQUEST_PKT = _enc.encode({"cmd": "STATE_REQUEST"})
 
 # ---------------- WebSocket callbacks ----------------
 
+def _msg_error_allowed():
+    """
+    Rate limiter for on_message logging: True for the first
+    MAX_MSG_ERRORS_PER_SEC problems in each 1 s window.
+    """
+    global _err_count, _err_window
+    now = time.monotonic()
+    if now - _err_window > 1.0:
+        _err_window = now
+        _err_count = 0
+    _err_count += 1
+    return _err_count <= MAX_MSG_ERRORS_PER_SEC
+
 def on_message(ws, message):
     """
-    Receive StreamData (binary MessagePack). Save into latest_state and mark waiting_state False.
+    Receive StreamData (binary MessagePack). Save into latest_state and signal state_ready.
     """
-    global latest_state, waiting_state
+    global latest_state
     try:
-        if isinstance(message, bytes):
-            latest_state = msgpack.unpackb(message, raw=False)
-            # Expecting StreamData shaped like {"state": {...}, "timestamp": ...}
-            # Save it
-            # state = latest_state.get("state", {})
-            # pos  = state.get("position", [0,0,0])
-            # rot  = state.get("rotation", [0,0,0])
-            # lv   = state.get("localVelocity", [0,0,0])
-            # lav  = state.get("localAngularVelocity", [0,0,0])
-
-            # print("\n==== Received StreamData ====")
-            # print(f"Position           {pos}")
-            # print(f"Rotation (Euler)   {rot}")
-            # print(f"Local Velocity     {lv}")
-            # print(f"Local Ang Vel      {lav}")
-            # print(f"Timestamp          {latest_state.get('timestamp')}")
-
-            # Mark state as received for sequence thread
-            with waiting_state_lock:
-                waiting_state = False
-        else:
-            # text messages (ignore)
-            print("[WS TEXT] ", message)
+        latest_state = _dec.decode(message)
+        # Decoded straight into StreamData (see Message types)
+        # Save it
+        # state = latest_state.state
+        # pos  = state.position
+        # rot  = state.rotation
+        # lv   = state.localVelocity
+        # lav  = state.localAngularVelocity
+
+        # print("\n==== Received StreamData ====")
+        # print(f"Position           {pos}")
+        # print(f"Rotation (Euler)   {rot}")
+        # print(f"Local Velocity     {lv}")
+        # print(f"Local Ang Vel      {lav}")
+        # print(f"Timestamp          {latest_state.timestamp}")
+
+        # Mark state as received for sequence thread
+        state_ready.set()
+    except TypeError:
+        # text frames arrive as str, which the decoder rejects with TypeError (ignore)
+        if _msg_error_allowed():
+            log.warning("[WS TEXT] %s", message)
     except Exception:
-        print("[WS ERROR] Error processing incoming message:")
-        traceback.print_exc()
+        # rate-limit so a stream of bad frames can't back up the receive loop
+        if _msg_error_allowed():
+            log.exception("[WS ERROR] Error processing incoming message:")
 
 def on_error(ws, error):
-    print("[WS ERROR]", error)
+    log.warning("[WS ERROR] %s", error)
 
 def on_close(ws, close_status_code, close_msg):
-    print("[WS CLOSED] code:", close_status_code, "msg:", close_msg)
+    log.info("[WS CLOSED] code: %s msg: %s", close_status_code, close_msg)
 
 def on_open(ws):
-    print("[WS OPEN] Connected to mod. Starting sequence thread.")
+    global _send_bin
+    log.info("[WS OPEN] Connected to mod. Starting sequence thread.")
+    # bind the socket's binary send once instead of going through ws.send(..., opcode=...)
+    _send_bin = ws.sock.send_binary
     # start the request/decide loop in a background thread
-    t = threading.Thread(target=sequence_thread, args=(ws,), daemon=True)
+    t = threading.Thread(target=sequence_thread, daemon=True)
     t.start()
 
 # ---------------- Sequence thread (request -> receive -> decide) ----------------
 
-def sequence_thread(ws):
+def sequence_thread():
     """
     Loop:
-      - set waiting_state
+      - clear state_ready
       - send STATE_REQUEST
-      - wait for on_message to fill latest_state (busy-wait with small sleep)
+      - wait for on_message to fill latest_state and set state_ready
       - compute action from latest_state
-      - store latest_cmd (thread-safe)
+      - send ACTION
       - wait remaining time to maintain dt
     """
-    global waiting_state, latest_state
+    global latest_state
 
     dt = UPDATE_INTERVAL  
-    print("[SEQ] Sequence thread started (request rate {:.1f} Hz)".format(1.0/dt))
+    log.info("[SEQ] Sequence thread started (request rate %.1f Hz)", 1.0/dt)
 
     # small warmup
     time.sleep(0.5)
 
+    deadline = time.perf_counter()
     while True:
-        start = time.time()
+        # schedule against a fixed deadline so sleep jitter doesn't accumulate
+        deadline += dt
         # request state
-        with waiting_state_lock:
-            waiting_state = True
-        request_state(ws)
+        state_ready.clear()
+        request_state()
 
-        # wait until on_message clears waiting_state OR timeout
+        # wait until on_message sets state_ready OR timeout
         timeout = 0.25  # 250 ms timeout to avoid locking forever
-        waited = 0.0
-        poll = 0.001
-        while True:
-            with waiting_state_lock:
-                if not waiting_state:
-                    break
-            time.sleep(poll)
-            waited += poll
-            if waited >= timeout:
-                # timed out: maybe the connection broke or the mod didn't respond
-                print("[SEQ] STATE_REQUEST timed out after {:.1f} ms".format(waited*1000))
-                break
-
-        # take snapshot of latest_state
-        state_snapshot = None
-        if latest_state is not None:
-            # shallow copy is fine as we don't mutate it
-            state_snapshot = dict(latest_state)
+        got = state_ready.wait(timeout)
+        if not got:
+            # timed out: maybe the connection broke or the mod didn't respond
+            log.warning("[SEQ] STATE_REQUEST timed out after %.1f ms", timeout*1000)
+
+        # take snapshot of latest_state (on_message rebinds it, never mutates it)
+        state_snapshot = latest_state
 
         # decide action based on state
         action = ml_policy(state_snapshot)
 
         # Send ACTION message back to Unity
-        send_action(ws, action)
+        send_action(action)
 
         # print("[SEQ] Decided action:", action)
 
         # maintain rate
-        elapsed = time.time() - start
-        remaining = dt - elapsed
+        remaining = deadline - time.perf_counter()
         if remaining > 0:
             time.sleep(remaining)
         else:
-            # if we're behind, yield a tiny bit
+            # if we're behind, yield a tiny bit and restart the schedule
             time.sleep(0.001)
+            deadline = time.perf_counter()
 
 # ---------------- WebSocket helpers ----------------
 
-def request_state(ws):
-    payload = {"cmd": "STATE_REQUEST"}
-    packet = msgpack.packb(payload, use_bin_type=True)
+def request_state():
     try:
-        ws.send(packet, opcode=websocket.ABNF.OPCODE_BINARY)
+        _send_bin(_STATE_REQUEST_PKT)
     except Exception:
-        print("[WS] send error in request_state()")
-        traceback.print_exc()
+        log.exception("[WS] send error in request_state()")
 
-def send_action(ws, action_dict):
+def send_action(action):
     """
     Serializes InputCommand → MessagePack and sends it.
     """
     try:
-        payload = {
-            "cmd": action_dict["cmd"],
-            "steer": float(action_dict["steer"]),
-            "brake": float(action_dict["brake"]),
-            "armsUp": float(action_dict["armsUp"]),
-            "reset": float(action_dict["reset"]),
-        }
-
-        packet = msgpack.packb(payload, use_bin_type=True)
-        ws.send(packet, opcode=websocket.ABNF.OPCODE_BINARY)
+        _send_bin(_enc.encode(action))
 
     except Exception:
-        print("[WS] Error sending ACTION")
-        traceback.print_exc()
+        log.exception("[WS] Error sending ACTION")
 
 
 
 
 # ---------------- ML policy (replace with your model) ----------------
 
+# Random samples are generated in bulk and handed out one row per tick
+_rng = np.random.default_rng()
+_rand_buf = []
+_rand_idx = 0
+
+def _next_rand():
+    """
+    Return the next (steer, brake, armsUp, reset) sample row as Python floats.
+    Steer is in [-1, 1), the others in [0, 1).
+    """
+    global _rand_buf, _rand_idx
+    if _rand_idx >= len(_rand_buf):
+        buf = _rng.random((8192, 4))
+        buf[:, 0] = 2.0 * buf[:, 0] - 1.0
+        _rand_buf = buf.tolist()
+        _rand_idx = 0
+    row = _rand_buf[_rand_idx]
+    _rand_idx += 1
+    return row
+
 def ml_policy(state):
     """
-    Replace this with your ML model. The state parameter is the StreamData dict
-    with 'state' key containing 'position','rotation','localVelocity','localAngularVelocity'
+    Replace this with your ML model. The state parameter is the StreamData struct
+    (or None) whose .state has position, rotation, localVelocity, localAngularVelocity.
+    Must return an InputCommand; its fields are cast to float when it is built.
     """
-    return {
-        "cmd": "ACTION",
-        "steer": random.uniform(-1, 1),
-        "brake": random.random(),
-        "armsUp": random.random(),
-        #"reset": 1 if random.random() < 0.1 else 0,
-        'reset': 0.0,
-    }
+    s, b, a, r = _next_rand()
+    return InputCommand(
+        steer=s,
+        brake=b,
+        armsUp=a,
+        #reset=1.0 if r < 0.1 else 0.0,
+        reset=0.0,
+    )
 
 # ---------------- cleanup and main ----------------
 
@@ -186,7 +241,7 @@ ws_global = None
 
 def cleanup(sig=None, frame=None):
     global ws_global
-    print("\n[EXIT] Cleaning up...")
+    log.info("[EXIT] Cleaning up...")
     try:
         if ws_global:
             ws_global.close()
@@ -200,6 +255,13 @@ signal.signal(signal.SIGTERM, cleanup)
 def start():
     global ws_global
 
+    # configure only our logger; root stays untouched so websocket-client's own
+    # "websocket" logger doesn't start echoing its messages alongside ours
+    handler = logging.StreamHandler()
+    handler.setFormatter(logging.Formatter("%(message)s"))
+    log.addHandler(handler)
+    log.setLevel(LOG_LEVEL)
+
 
     # create websocket client and connect
     ws_global = websocket.WebSocketApp(